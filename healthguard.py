@@ -1,9 +1,18 @@
+import copy
+import math
+import os
 import sqlite3
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from dataclasses import dataclass, asdict
-from typing import List, Optional
+from dataclasses import dataclass, field
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
 
 
 VITAL_RANGES = {
@@ -17,6 +26,143 @@ VITAL_RANGES = {
 
 REQUIRED_COLS = ["patient_id", "heart_rate", "bp_systolic",
                  "bp_diastolic", "temperature", "spo2", "resp_rate"]
+INSERT_COLS = REQUIRED_COLS + ["timestamp"]
+CSV_CHUNKSIZE = 50_000
+SCAN_CHUNKSIZE = 50_000
+
+# Sentinel for scans that are not restricted to one patient
+_ALL_PATIENTS = object()
+
+# WHERE clause selecting only rows with at least one vital out of range, so
+# SQLite filters the table before anything is handed to Python.
+_ANOMALY_FILTER = " OR ".join(f"({v} < ? OR {v} > ?)" for v in VITAL_RANGES)
+_ANOMALY_PARAMS = [bound for rng in VITAL_RANGES.values() for bound in rng]
+
+# One-statement patient summary: per vital mean, min, max, non-NULL count and
+# sum of squared deviations from the mean (two-pass, so the sample std stays
+# numerically stable). All aggregation happens inside SQLite, so no vitals
+# rows are transferred to Python.
+_SUMMARY_QUERY = (
+    "WITH p AS (SELECT * FROM vitals WHERE patient_id = ?), "
+    "m AS (SELECT " + ", ".join(f"AVG({v}) AS {v}" for v in VITAL_RANGES) + " FROM p) "
+    "SELECT COUNT(*), MIN(p.timestamp), MAX(p.timestamp), "
+    + ", ".join(
+        f"m.{v}, MIN(p.{v}), MAX(p.{v}), COUNT(p.{v}), "
+        f"SUM((p.{v} - m.{v}) * (p.{v} - m.{v}))"
+        for v in VITAL_RANGES
+    )
+    + " FROM p, m"
+)
+
+# Per-vital constants for the scoring kernel and alert messages, laid out in
+# VITAL_RANGES order so column j of a vitals matrix maps to index j here.
+_VITAL_NAMES = tuple(VITAL_RANGES)
+_LOWS = np.array([lo for lo, _ in VITAL_RANGES.values()], dtype=np.float64)
+_HIGHS = np.array([hi for _, hi in VITAL_RANGES.values()], dtype=np.float64)
+_SPANS = _HIGHS - _LOWS
+_MSG_TEMPLATES = {
+    v: f"{v}={{:.1f}} outside [{lo},{hi}]" for v, (lo, hi) in VITAL_RANGES.items()
+}
+
+
+def _score_block(vals: np.ndarray, lows: np.ndarray, highs: np.ndarray,
+                 spans: np.ndarray) -> tuple:
+    """Score an ``(N, V)`` block of vitals against per-column ranges.
+
+    Returns ``(rows, cols, devs)`` for every out-of-range cell, where *devs*
+    is the deviation past the nearest bound as a fraction of the range span.
+    Runs entirely in NumPy, so the GIL is released for the heavy lifting.
+    """
+    # Spans are positive, so max(a/s, b/s) == max(a, b)/s: the full block
+    # only needs subtractions and a compare, and the division is deferred to
+    # the (few) offending cells.
+    excess = np.maximum(lows - vals, vals - highs)
+    rows, cols = np.nonzero(excess > 0)
+    return rows, cols, excess[rows, cols] / spans[cols]
+
+
+def _column_names(columns) -> list:
+    """Column names of a mapping, pyarrow.Table or polars.DataFrame."""
+    if hasattr(columns, "column_names"):
+        return list(columns.column_names)
+    if hasattr(columns, "keys"):
+        return list(columns.keys())
+    return list(columns.columns)
+
+
+def _py(value):
+    """Unbox NumPy scalars so sqlite3 binds them as numbers, not BLOBs."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _sql_values(series: pd.Series) -> pd.Series:
+    """Column values sqlite3 can bind, with pandas extension NAs as ``None``.
+
+    NumPy-backed columns pass through untouched (NaN already binds as NULL);
+    nullable dtypes such as ``Int64`` are boxed to objects first.
+    """
+    if isinstance(series.dtype, np.dtype):
+        return series
+    return series.astype(object).where(series.notna(), None)
+
+
+def _real(value: Optional[float]) -> float:
+    """SQL aggregate result as a float, mapping NULL to NaN."""
+    return math.nan if value is None else float(value)
+
+
+def _vitals_query(where: str) -> str:
+    return (f"SELECT patient_id, timestamp, {', '.join(VITAL_RANGES)} "
+            f"FROM vitals WHERE {where}")
+
+
+def _vitals_arrays(rows: list) -> tuple:
+    if not rows:
+        return (np.empty(0, dtype=object), np.empty(0),
+                np.empty((0, len(VITAL_RANGES))))
+    data = np.array([r[1:] for r in rows], dtype=np.float64)
+    pids = np.array([r[0] for r in rows], dtype=object)
+    return pids, data[:, 0], data[:, 1:]
+
+
+def _iter_vitals(conn: sqlite3.Connection, where: str, params: list,
+                 chunksize: int) -> Iterator[tuple]:
+    """Yield matching vitals in blocks of at most *chunksize* rows.
+
+    Each block is ``(patient_ids, timestamps, values)`` where ``values`` is
+    an ``(N, len(VITAL_RANGES))`` float64 matrix; NULL readings are NaN.
+    """
+    cur = conn.execute(_vitals_query(where), params)
+    try:
+        while True:
+            rows = cur.fetchmany(chunksize)
+            if not rows:
+                return
+            yield _vitals_arrays(rows)
+    finally:
+        cur.close()
+
+
+def _scan_anomalies(conn: sqlite3.Connection, patient_id=_ALL_PATIENTS,
+                    chunksize: int = SCAN_CHUNKSIZE) -> "AlertBatch":
+    """Score out-of-range vitals read through *conn* without persisting them.
+
+    Any *patient_id* other than ``_ALL_PATIENTS`` is matched with ``IS``, so
+    NULL and empty ids select their own rows rather than the whole table.
+    """
+    where = f"({_ANOMALY_FILTER})"
+    params = list(_ANOMALY_PARAMS)
+    if patient_id is not _ALL_PATIENTS:
+        where += " AND patient_id IS ?"
+        params.append(patient_id)
+    batches = []
+    for pids, timestamps, vals in _iter_vitals(conn, where, params, chunksize):
+        rows, cols, devs = _score_block(vals, _LOWS, _HIGHS, _SPANS)
+        batches.append(AlertBatch(
+            pids[rows], timestamps[rows], cols, vals[rows, cols],
+            np.where(devs > 0.5, "critical", "warning"),
+        ))
+    return AlertBatch.concat(batches)
 
 
 @dataclass
@@ -26,12 +172,82 @@ class Alert:
     vital: str
     value: float
     severity: str
-    message: str
+    # Unrounded reading, so the message rounds once from the measured value
+    raw_value: Optional[float] = field(default=None, repr=False, compare=False)
+
+    @property
+    def message(self) -> str:
+        """Human-readable description, formatted only when accessed."""
+        value = self.value if self.raw_value is None else self.raw_value
+        return _MSG_TEMPLATES[self.vital].format(value)
+
+
+class AlertBatch:
+    """Alerts from one detection pass, stored column-wise.
+
+    Each field is a parallel NumPy array rather than one ``Alert`` object per
+    anomaly. Iterating the batch yields ``Alert`` instances on demand, so
+    callers that just loop over alerts keep working unchanged.
+    """
+
+    def __init__(self, patient_ids: np.ndarray, timestamps: np.ndarray,
+                 vital_idx: np.ndarray, values: np.ndarray, severities: np.ndarray):
+        self.patient_ids = patient_ids
+        self.timestamps = timestamps
+        self.vital_idx = vital_idx
+        self.values = values
+        self.severities = severities
+
+    @classmethod
+    def empty(cls) -> "AlertBatch":
+        return cls(np.empty(0, dtype=object), np.empty(0), np.empty(0, dtype=np.intp),
+                   np.empty(0), np.empty(0, dtype=str))
+
+    @classmethod
+    def concat(cls, batches: List["AlertBatch"]) -> "AlertBatch":
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        return cls(*(
+            np.concatenate([getattr(b, field) for b in batches])
+            for field in ("patient_ids", "timestamps", "vital_idx", "values", "severities")
+        ))
+
+    def __len__(self) -> int:
+        return len(self.vital_idx)
+
+    def __iter__(self):
+        for fields in self._columns():
+            yield Alert(*fields)
+
+    def records(self):
+        """Yield ``(patient_id, timestamp, vital, value, severity, message)`` tuples."""
+        for pid, ts, vital, value, severity, raw in self._columns():
+            yield pid, ts, vital, value, severity, _MSG_TEMPLATES[vital].format(raw)
+
+    def _columns(self):
+        raw = self.values.tolist()
+        return zip(
+            self.patient_ids.tolist(), self.timestamps.tolist(),
+            [_VITAL_NAMES[j] for j in self.vital_idx.tolist()],
+            [round(v, 2) for v in raw], self.severities.tolist(), raw,
+        )
 
 
 class HealthPipeline:
     def __init__(self, db_path: str = ":memory:"):
+        self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
+        self._in_transaction = False
+        # patient_id -> ((row_count, max_timestamp), summary)
+        self._summary_cache: Dict[str, Tuple[tuple, dict]] = {}
+        # Performance pragmas for ingest-heavy workloads
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA cache_size=-64000")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA mmap_size=268435456")
         self._init_db()
 
     def _init_db(self):
@@ -46,72 +262,202 @@ class HealthPipeline:
             "id INTEGER PRIMARY KEY AUTOINCREMENT, patient_id TEXT, timestamp REAL,"
             "vital TEXT, value REAL, severity TEXT, message TEXT)"
         )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_vitals_pid_ts ON vitals(patient_id, timestamp)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_alerts_pid_ts ON alerts(patient_id, timestamp)"
+        )
         self.conn.commit()
 
+    @contextmanager
+    def transaction(self):
+        """Group several ingest/detect calls into one ``BEGIN IMMEDIATE`` transaction.
+
+        Commits made by the individual methods are deferred until the block
+        exits, so a whole ingest-then-detect pipeline costs a single commit.
+        Nested use joins the outer transaction.
+        """
+        if self._in_transaction:
+            yield self
+            return
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._in_transaction = True
+        try:
+            yield self
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self._in_transaction = False
+
+    def _commit(self):
+        if not self._in_transaction:
+            self.conn.commit()
+
     def ingest(self, records: List[dict]) -> int:
-        df = pd.DataFrame(records)
+        """Ingest row dicts. Prefer ``ingest_columns`` when data is already columnar."""
+        first = records[0] if records else {}
+        for col in REQUIRED_COLS:
+            if col not in first:
+                raise ValueError(f"Missing column: {col}")
+        ts_default = time.time()
+        self._insert_vitals(
+            tuple(_py(r.get(c)) for c in REQUIRED_COLS)
+            + (_py(r.get("timestamp", ts_default)),)
+            for r in records
+        )
+        return len(records)
+
+    def ingest_columns(self, columns) -> int:
+        """Ingest equal-length column arrays without building per-row dicts.
+
+        *columns* may be a mapping of column name to array-like (e.g.
+        ``dict[str, np.ndarray]`` or a pandas DataFrame), a ``pyarrow.Table``
+        or a ``polars.DataFrame``. ``timestamp`` is optional.
+        """
+        names = set(_column_names(columns))
+        for col in REQUIRED_COLS:
+            if col not in names:
+                raise ValueError(f"Missing column: {col}")
+        present = [c for c in INSERT_COLS if c in names]
+        data = [np.asarray(columns[c]).tolist() for c in present]
+        n = len(data[0])
+        if any(len(col) != n for col in data):
+            raise ValueError("Columns must all have the same length")
+        if "timestamp" not in names:
+            data.append(repeat(time.time(), n))
+        self._insert_vitals(zip(*data))
+        return n
+
+    def ingest_csv(self, filepath: str, chunksize: int = CSV_CHUNKSIZE) -> int:
+        """Stream a CSV into the vitals table, one transaction per chunk.
+
+        Inside an enclosing ``transaction()`` the per-chunk commits are
+        deferred, so the whole file lands in that single transaction.
+        """
+        total = 0
+        for chunk in pd.read_csv(filepath, chunksize=chunksize):
+            total += self._ingest_frame(chunk)
+        return total
+
+    def ingest_and_detect(self, records: List[dict]) -> AlertBatch:
+        """Ingest *records* and scan for anomalies in one transaction."""
+        with self.transaction():
+            self.ingest(records)
+            return self.detect_anomalies()
+
+    def _ingest_frame(self, df: pd.DataFrame) -> int:
         for col in REQUIRED_COLS:
             if col not in df.columns:
                 raise ValueError(f"Missing column: {col}")
         if "timestamp" not in df.columns:
             df["timestamp"] = time.time()
-        df[REQUIRED_COLS + ["timestamp"]].to_sql(
-            "vitals", self.conn, if_exists="append", index=False
-        )
+        # Plain tuples rather than a Series/dict per row
+        self._insert_vitals(df[INSERT_COLS].itertuples(index=False, name=None))
         return len(df)
 
-    def ingest_csv(self, filepath: str) -> int:
-        df = pd.read_csv(filepath)
-        return self.ingest(df.to_dict("records"))
-
-    def detect_anomalies(self, patient_id: Optional[str] = None) -> List[Alert]:
-        query = "SELECT * FROM vitals"
-        params = []
-        if patient_id:
-            query += " WHERE patient_id = ?"
-            params = [patient_id]
-        df = pd.read_sql(query, self.conn, params=params)
-        if df.empty:
-            return []
-        alerts = []
-        for vital, (low, high) in VITAL_RANGES.items():
-            span = high - low
-            for _, row in df.iterrows():
-                val = row[vital]
-                dev = max((low - val) / span, (val - high) / span, 0)
-                if dev > 0:
-                    severity = "critical" if dev > 0.5 else "warning"
-                    alerts.append(Alert(
-                        patient_id=row["patient_id"], timestamp=row["timestamp"],
-                        vital=vital, value=round(val, 2), severity=severity,
-                        message=f"{vital}={val:.1f} outside [{low},{high}]",
-                    ))
+    def _insert_vitals(self, rows) -> None:
+        """Append rows ordered as ``INSERT_COLS`` to the vitals table."""
+        self.conn.executemany(
+            f"INSERT INTO vitals ({', '.join(INSERT_COLS)}) "
+            f"VALUES ({', '.join('?' * len(INSERT_COLS))})",
+            rows,
+        )
+        self._commit()
+
+    def detect_anomalies(self, patient_id: Optional[str] = None,
+                         chunksize: int = SCAN_CHUNKSIZE) -> AlertBatch:
+        """Score out-of-range vitals in blocks of *chunksize* rows and store alerts."""
+        alerts = _scan_anomalies(self.conn, patient_id or _ALL_PATIENTS, chunksize)
+        self._store_alerts(alerts)
+        return alerts
+
+    def detect_anomalies_all(self, max_workers: Optional[int] = None) -> AlertBatch:
+        """Scan every patient in parallel, one read-only connection per worker.
+
+        Patients are partitioned across a thread pool; SQLite and the NumPy
+        kernel both release the GIL, so workers overlap. Alerts are written
+        back in a single batch on this connection. In-memory databases and
+        calls inside ``transaction()`` fall back to ``detect_anomalies()``,
+        since other connections cannot see their rows.
+        """
+        if self.db_path in ("", ":memory:") or self._in_transaction:
+            return self.detect_anomalies()
+        self._commit()
+        pids = [r[0] for r in self.conn.execute("SELECT DISTINCT patient_id FROM vitals")]
+        workers = min(max_workers or os.cpu_count() or 1, len(pids))
+        if workers <= 1:
+            return self.detect_anomalies()
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+
+        def scan_group(group: List[str]) -> List[AlertBatch]:
+            conn = sqlite3.connect(uri, uri=True)
+            try:
+                return [_scan_anomalies(conn, pid) for pid in group]
+            finally:
+                conn.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            groups = ex.map(scan_group, [pids[i::workers] for i in range(workers)])
+            alerts = AlertBatch.concat([b for group in groups for b in group])
+        self._store_alerts(alerts)
+        return alerts
+
+    def _store_alerts(self, alerts: AlertBatch) -> None:
         if alerts:
-            pd.DataFrame([asdict(a) for a in alerts]).to_sql(
-                "alerts", self.conn, if_exists="append", index=False
+            self.conn.executemany(
+                "INSERT INTO alerts "
+                "(patient_id, timestamp, vital, value, severity, message) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                alerts.records(),
             )
-        return alerts
+            self._commit()
 
     def get_patient_summary(self, patient_id: str) -> dict:
-        df = pd.read_sql(
-            "SELECT * FROM vitals WHERE patient_id = ?",
-            self.conn, params=[patient_id],
-        )
-        if df.empty:
+        """Summary statistics for one patient, cached until new vitals arrive.
+
+        The cache is keyed on ``(COUNT(*), MAX(timestamp))`` for the patient,
+        an index-only probe, so any ingest for that patient invalidates it.
+        """
+        signature = self.conn.execute(
+            "SELECT COUNT(*), MAX(timestamp) FROM vitals WHERE patient_id = ?",
+            (patient_id,),
+        ).fetchone()
+        cached = self._summary_cache.get(patient_id)
+        if cached is None or cached[0] != signature:
+            cached = (signature, self._compute_summary(patient_id))
+            self._summary_cache[patient_id] = cached
+        # Callers get their own copy so edits never leak into the cache
+        return copy.deepcopy(cached[1])
+
+    def _compute_summary(self, patient_id: str) -> dict:
+        row = self.conn.execute(_SUMMARY_QUERY, (patient_id,)).fetchone()
+        records, t_min, t_max = row[:3]
+        if records == 0:
             return {"patient_id": patient_id, "records": 0}
-        vitals = list(VITAL_RANGES.keys())
         stats = {}
-        for v in vitals:
+        for i, v in enumerate(VITAL_RANGES):
+            mean, lo, hi, n, sq_dev = row[3 + 5 * i: 8 + 5 * i]
+            if records <= 1:
+                std = 0.0
+            elif n > 1:
+                std = math.sqrt(sq_dev / (n - 1))
+            else:
+                std = math.nan
             stats[v] = {
-                "mean": round(df[v].mean(), 2),
-                "min": round(df[v].min(), 2),
-                "max": round(df[v].max(), 2),
-                "std": round(df[v].std(), 2) if len(df) > 1 else 0.0,
+                "mean": round(_real(mean), 2),
+                "min": round(_real(lo), 2),
+                "max": round(_real(hi), 2),
+                "std": round(std, 2),
             }
         return {
             "patient_id": patient_id,
-            "records": len(df),
-            "time_range": [float(df["timestamp"].min()), float(df["timestamp"].max())],
+            "records": records,
+            "time_range": [_real(t_min), _real(t_max)],
             "vitals_stats": stats,
         }
 
@@ -260,14 +606,22 @@ class HealthRecordRepository:
     def bulk_insert(self, patient_id: str, df: pd.DataFrame):
         """Bulk-insert a DataFrame of health metrics for a given patient.
 
-        Uses pandas ``to_sql`` for high throughput (>= 10 k rows/sec).
+        Rows are streamed column-wise into a single ``executemany`` inside one
+        transaction; the caller's frame is neither copied nor modified.
         """
-        df = df.copy()
-        df["patient_id"] = patient_id
-        if "timestamp" not in df.columns:
-            df["timestamp"] = time.time()
-        with self._cursor() as _cur:
-            df.to_sql(self.TABLE, self.conn, if_exists="append", index=False)
+        metric_cols = [c for c in df.columns if c not in ("patient_id", "timestamp")]
+        if "timestamp" in df.columns:
+            timestamps = _sql_values(df["timestamp"])
+        else:
+            timestamps = repeat(time.time(), len(df))
+        cols = ["patient_id", "timestamp"] + metric_cols
+        placeholders = ", ".join(["?"] * len(cols))
+        col_str = ", ".join(cols)
+        rows = zip(repeat(patient_id), timestamps, *(_sql_values(df[c]) for c in metric_cols))
+        with self._cursor() as cur:
+            cur.executemany(
+                f"INSERT INTO {self.TABLE} ({col_str}) VALUES ({placeholders})", rows
+            )
 
     # -- read operations -------------------------------------------------
 
@@ -284,8 +638,23 @@ class HealthRecordRepository:
                 params=(patient_id, start_time, end_time),
             )
 
-    def get_latest(self, patient_id: str, n: int = 10) -> pd.DataFrame:
-        """Return the *n* most recent records for a patient (newest first)."""
+    def get_latest(self, patient_id: str, n: int = 10) -> List[dict]:
+        """Return the *n* most recent records for a patient (newest first).
+
+        Returns plain dicts; building a DataFrame costs more than the query
+        for the small *n* used by polling loops. See ``get_latest_df``.
+        """
+        with self._cursor() as cur:
+            cur.row_factory = sqlite3.Row
+            cur.execute(
+                f"SELECT * FROM {self.TABLE} "
+                "WHERE patient_id = ? ORDER BY timestamp DESC LIMIT ?",
+                (patient_id, n),
+            )
+            return [dict(r) for r in cur.fetchall()]
+
+    def get_latest_df(self, patient_id: str, n: int = 10) -> pd.DataFrame:
+        """DataFrame variant of ``get_latest``."""
         with self._cursor() as _cur:
             return pd.read_sql_query(
                 f"SELECT * FROM {self.TABLE} "
@@ -7,9 +7,10 @@ from healthguard import HealthPipeline
 
 def cmd_ingest(args):
     pipe = HealthPipeline(args.db)
-    count = pipe.ingest_csv(args.file)
+    with pipe.transaction():
+        count = pipe.ingest_csv(args.file)
+        alerts = pipe.detect_anomalies()
     print(f"Ingested {count} records from {args.file}")
-    alerts = pipe.detect_anomalies()
     if alerts:
         print(f"\u26a0 {len(alerts)} anomalies detected!")
         for a in alerts:
@@ -22,7 +23,10 @@ def cmd_ingest(args):
 
 def cmd_monitor(args):
     pipe = HealthPipeline(args.db)
-    alerts = pipe.detect_anomalies(args.patient)
+    if args.patient:
+        alerts = pipe.detect_anomalies(args.patient)
+    else:
+        alerts = pipe.detect_anomalies_all()
     if not alerts:
         print("\u2705 All vitals within normal range.")
     else:
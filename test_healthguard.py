@@ -1,9 +1,12 @@
 import csv
+import math
 import time
 
+import numpy as np
+import pandas as pd
 import pytest
 
-from healthguard import HealthPipeline
+from healthguard import HealthPipeline, HealthRecordRepository
 
 
 def make_record(patient_id="P001", **overrides):
@@ -36,6 +39,22 @@ class TestIngest:
         with pytest.raises(ValueError, match="Missing column"):
             self.pipe.ingest([{"patient_id": "P001"}])
 
+    def test_ingest_defaults_timestamp(self):
+        rec = make_record()
+        del rec["timestamp"]
+        before = time.time()
+        self.pipe.ingest([rec])
+        (ts,) = self.pipe.conn.execute("SELECT timestamp FROM vitals").fetchone()
+        assert ts >= before
+
+    def test_ingest_numpy_scalars(self):
+        self.pipe.ingest([make_record(heart_rate=np.int64(110), spo2=np.float32(98))])
+        (kind,) = self.pipe.conn.execute("SELECT typeof(heart_rate) FROM vitals").fetchone()
+        assert kind == "real"
+        alerts = self.pipe.detect_anomalies()
+        assert [(a.vital, a.value) for a in alerts] == [("heart_rate", 110.0)]
+        assert self.pipe.get_patient_summary("P001")["vitals_stats"]["spo2"]["mean"] == 98.0
+
     def test_ingest_csv(self, tmp_path):
         csv_file = tmp_path / "vitals.csv"
         with open(csv_file, "w", newline="") as f:
@@ -47,6 +66,31 @@ class TestIngest:
         count = self.pipe.ingest_csv(str(csv_file))
         assert count == 2
 
+    def test_ingest_csv_chunked(self, tmp_path):
+        csv_file = tmp_path / "vitals.csv"
+        with open(csv_file, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(make_record().keys()))
+            writer.writeheader()
+            for i in range(5):
+                writer.writerow(make_record(f"P{i:03d}"))
+        count = self.pipe.ingest_csv(str(csv_file), chunksize=2)
+        assert count == 5
+        (n,) = self.pipe.conn.execute("SELECT COUNT(*) FROM vitals").fetchone()
+        assert n == 5
+
+    def test_ingest_columns(self):
+        recs = [make_record(), make_record("P002", heart_rate=120)]
+        cols = {k: np.array([r[k] for r in recs]) for k in recs[0]}
+        assert self.pipe.ingest_columns(cols) == 2
+        alerts = self.pipe.detect_anomalies()
+        assert [(a.patient_id, a.vital) for a in alerts] == [("P002", "heart_rate")]
+
+    def test_ingest_columns_length_mismatch(self):
+        cols = {k: [v] for k, v in make_record().items()}
+        cols["spo2"] = [98, 97]
+        with pytest.raises(ValueError, match="same length"):
+            self.pipe.ingest_columns(cols)
+
 
 class TestAnomalyDetection:
     def setup_method(self):
@@ -66,6 +110,15 @@ class TestAnomalyDetection:
         hr = [a for a in alerts if a.vital == "heart_rate"]
         assert len(hr) == 1
         assert hr[0].severity == "warning"
+        assert hr[0].message == "heart_rate=110.0 outside [60,100]"
+
+    def test_message_rounds_raw_reading(self):
+        self.pipe.ingest([make_record(spo2=88.3501)])
+        (alert,) = self.pipe.detect_anomalies()
+        assert alert.value == 88.35
+        assert alert.message == "spo2=88.4 outside [95,100]"
+        (stored,) = self.pipe.conn.execute("SELECT message FROM alerts").fetchone()
+        assert stored == alert.message
 
     def test_critical_temperature(self):
         self.pipe.ingest([make_record(temperature=40.5)])
@@ -81,6 +134,80 @@ class TestAnomalyDetection:
         assert len(spo2) == 1
         assert spo2[0].severity == "critical"
 
+    def test_multiple_vitals_multiple_rows(self):
+        self.pipe.ingest([
+            make_record("P001", heart_rate=130, spo2=90),
+            make_record("P002"),
+            make_record("P003", resp_rate=6),
+        ])
+        alerts = self.pipe.detect_anomalies()
+        got = sorted((a.patient_id, a.vital, a.severity) for a in alerts)
+        assert got == [
+            ("P001", "heart_rate", "critical"),
+            ("P001", "spo2", "critical"),
+            ("P003", "resp_rate", "critical"),
+        ]
+
+    def test_missing_vital_ignored(self):
+        self.pipe.ingest([make_record(heart_rate=110, spo2=None)])
+        alerts = self.pipe.detect_anomalies()
+        assert [a.vital for a in alerts] == ["heart_rate"]
+
+    def test_detect_anomalies_chunked(self):
+        self.pipe.ingest([make_record(f"P{i:03d}", heart_rate=110 + i) for i in range(5)])
+        alerts = self.pipe.detect_anomalies(chunksize=2)
+        assert [a.patient_id for a in alerts] == [f"P{i:03d}" for i in range(5)]
+        assert [a.value for a in alerts] == [110.0 + i for i in range(5)]
+
+    def test_alerts_columnar_and_persisted(self):
+        self.pipe.ingest([make_record(heart_rate=110), make_record(spo2=85)])
+        alerts = self.pipe.detect_anomalies()
+        assert len(alerts) == 2
+        assert sorted(alerts.severities.tolist()) == ["critical", "warning"]
+        (n,) = self.pipe.conn.execute("SELECT COUNT(*) FROM alerts").fetchone()
+        assert n == 2
+
+    def test_ingest_and_detect(self):
+        alerts = self.pipe.ingest_and_detect([make_record(heart_rate=110)])
+        assert [a.vital for a in alerts] == ["heart_rate"]
+        assert not self.pipe.conn.in_transaction
+
+    def test_transaction_rolls_back_on_error(self):
+        with pytest.raises(ValueError):
+            with self.pipe.transaction():
+                self.pipe.ingest([make_record()])
+                self.pipe.ingest([{"patient_id": "P002"}])
+        (n,) = self.pipe.conn.execute("SELECT COUNT(*) FROM vitals").fetchone()
+        assert n == 0
+
+    def test_detect_all_in_memory_falls_back(self):
+        self.pipe.ingest([make_record("P001", heart_rate=110), make_record("P002")])
+        alerts = self.pipe.detect_anomalies_all(max_workers=4)
+        assert [(a.patient_id, a.vital) for a in alerts] == [("P001", "heart_rate")]
+
+    def test_detect_all_parallel_matches_serial(self, tmp_path):
+        pipe = HealthPipeline(str(tmp_path / "hg.db"))
+        try:
+            pipe.ingest([make_record(f"P{i:03d}", heart_rate=50 + 10 * i) for i in range(8)])
+            parallel = pipe.detect_anomalies_all(max_workers=3)
+            serial = pipe.detect_anomalies()
+            key = lambda a: (a.patient_id, a.vital, a.severity, a.value)
+            assert sorted(map(key, parallel)) == sorted(map(key, serial))
+            assert len(parallel) == 3
+            (n,) = pipe.conn.execute("SELECT COUNT(*) FROM alerts").fetchone()
+            assert n == 2 * len(parallel)
+        finally:
+            pipe.close()
+
+    def test_detect_all_null_patient_id(self, tmp_path):
+        pipe = HealthPipeline(str(tmp_path / "hg.db"))
+        try:
+            pipe.ingest([make_record(pid, heart_rate=110) for pid in ("A", "B", None, "")])
+            alerts = pipe.detect_anomalies_all(max_workers=4)
+            assert sorted(a.patient_id or "" for a in alerts) == ["", "", "A", "B"]
+        finally:
+            pipe.close()
+
 
 class TestReports:
     def setup_method(self):
@@ -101,3 +228,87 @@ class TestReports:
     def test_empty_patient_summary(self):
         s = self.pipe.get_patient_summary("PXXX")
         assert s["records"] == 0
+
+    def test_summary_stats_match_pandas(self):
+        recs = [
+            make_record("P001", heart_rate=hr, spo2=spo2, timestamp=float(i))
+            for i, (hr, spo2) in enumerate([(62, 97), (75.5, None), (91, 99), (70, 96)])
+        ]
+        self.pipe.ingest(recs)
+        s = self.pipe.get_patient_summary("P001")
+        df = pd.DataFrame(recs)
+        for v in ("heart_rate", "spo2"):
+            assert s["vitals_stats"][v] == {
+                "mean": round(df[v].mean(), 2),
+                "min": round(df[v].min(), 2),
+                "max": round(df[v].max(), 2),
+                "std": round(df[v].std(), 2),
+            }
+        assert s["time_range"] == [0.0, 3.0]
+
+    def test_single_record_summary(self):
+        self.pipe.ingest([make_record("P001", timestamp=None)])
+        s = self.pipe.get_patient_summary("P001")
+        assert s["records"] == 1
+        assert s["vitals_stats"]["heart_rate"] == {
+            "mean": 75.0, "min": 75.0, "max": 75.0, "std": 0.0,
+        }
+        assert all(math.isnan(t) for t in s["time_range"])
+
+    def test_summary_cache_invalidated_by_ingest(self, monkeypatch):
+        computed = []
+        compute = self.pipe._compute_summary
+        monkeypatch.setattr(
+            self.pipe, "_compute_summary",
+            lambda pid: computed.append(pid) or compute(pid),
+        )
+        self.pipe.ingest([make_record("P001", heart_rate=70, timestamp=1.0)])
+        first = self.pipe.get_patient_summary("P001")
+        first["note"] = "edited by caller"
+        again = self.pipe.get_patient_summary("P001")
+        assert "note" not in again
+        assert again["vitals_stats"] == first["vitals_stats"]
+        assert computed == ["P001"]
+        self.pipe.ingest([make_record("P002", timestamp=5.0)])
+        self.pipe.get_patient_summary("P001")
+        assert computed == ["P001"]
+        self.pipe.ingest([make_record("P001", heart_rate=90, timestamp=2.0)])
+        second = self.pipe.get_patient_summary("P001")
+        assert computed == ["P001", "P001"]
+        assert second["records"] == 2
+        assert second["vitals_stats"]["heart_rate"]["mean"] == 80.0
+
+
+class TestHealthRecordRepository:
+    def setup_method(self):
+        self.repo = HealthRecordRepository(":memory:")
+
+    def teardown_method(self):
+        self.repo.close()
+
+    def test_bulk_insert_leaves_frame_untouched(self):
+        df = pd.DataFrame({"timestamp": [1.0, 2.0], "heart_rate": [70, 80]})
+        self.repo.bulk_insert("P001", df)
+        assert list(df.columns) == ["timestamp", "heart_rate"]
+        out = self.repo.query_records("P001", 0.0, 10.0)
+        assert out["heart_rate"].tolist() == [70.0, 80.0]
+        assert (out["patient_id"] == "P001").all()
+
+    def test_bulk_insert_nullable_dtype(self):
+        df = pd.DataFrame({
+            "timestamp": [1.0, 2.0],
+            "heart_rate": pd.array([70, pd.NA], dtype="Int64"),
+        })
+        self.repo.bulk_insert("P001", df)
+        rows = self.repo.conn.execute(
+            "SELECT heart_rate FROM health_records ORDER BY timestamp"
+        ).fetchall()
+        assert rows == [(70.0,), (None,)]
+
+    def test_get_latest_returns_newest_first(self):
+        for ts in (1.0, 2.0, 3.0):
+            self.repo.insert_record("P001", {"heart_rate": 70 + ts}, timestamp=ts)
+        latest = self.repo.get_latest("P001", n=2)
+        assert [r["timestamp"] for r in latest] == [3.0, 2.0]
+        assert latest[0]["heart_rate"] == 73.0
+        assert len(self.repo.get_latest_df("P001")) == 3